@@ -0,0 +1,227 @@
+import os
+import glob
+import fcntl
+import shutil
+import logging
+import tempfile
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from db_handler import fetch_cheque_details_since
+
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+
+# Constants
+ANALYTICS_STORE_DIR = "analytics_store"
+SNAPSHOT_DIR = os.path.join(ANALYTICS_STORE_DIR, "cheque_details")
+LOCK_PATH = os.path.join(ANALYTICS_STORE_DIR, "cheque_details.lock")
+MAX_SNAPSHOT_PARTS = 32
+
+# PostgreSQL type OIDs (cursor.description type codes) mapped to Arrow types;
+# anything not listed here is stored as a string
+POSTGRES_ARROW_TYPES = {
+    16: pa.bool_(),                        # boolean
+    20: pa.int64(),                        # bigint
+    21: pa.int64(),                        # smallint
+    23: pa.int64(),                        # integer
+    700: pa.float64(),                     # real
+    701: pa.float64(),                     # double precision
+    1700: pa.float64(),                    # numeric
+    1082: pa.date32(),                     # date
+    1114: pa.timestamp("us"),              # timestamp
+    1184: pa.timestamp("us", tz="UTC"),    # timestamp with time zone
+}
+
+
+# Clean the amount string
+def clean_amount(amount_str):
+    """Remove non-numeric characters and convert to float."""
+    if not amount_str or not amount_str.strip().replace(",", "").replace("/-", "").isnumeric():
+        return 0.0
+    return float(amount_str.replace(",", "").replace("/-", "").strip())
+
+
+@contextmanager
+def _snapshot_lock():
+    """Hold an exclusive lock so only one session touches the snapshot at a time."""
+    os.makedirs(ANALYTICS_STORE_DIR, exist_ok=True)
+    with open(LOCK_PATH, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _part_paths(snapshot_dir):
+    """Snapshot part files ordered by the first id they contain."""
+    paths = glob.glob(os.path.join(snapshot_dir, "part-*.arrow"))
+    return sorted(paths, key=lambda path: int(os.path.basename(path).split("-")[1]))
+
+
+def _rows_to_table(rows, columns):
+    """Build an Arrow table from cheque_details rows.
+
+    Columns get the Arrow type matching their PostgreSQL type. The
+    amount_in_numbers text is cleaned into float64 so the dashboard can
+    aggregate it without converting strings on every visit.
+    """
+    values_by_column = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = []
+    names = []
+    for (name, type_code), values in zip(columns, values_by_column):
+        arrow_type = POSTGRES_ARROW_TYPES.get(type_code, pa.string())
+        if name == "amount_in_numbers":
+            if pa.types.is_floating(arrow_type):
+                values = [None if v is None else float(v) for v in values]
+            else:
+                values = [clean_amount(v) for v in values]
+            arrow_type = pa.float64()
+        elif type_code == 1700:
+            values = [None if v is None else float(v) for v in values]
+        elif pa.types.is_string(arrow_type):
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=arrow_type))
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _write_part(snapshot_dir, table):
+    """Write a table as a new Arrow IPC part named after its id range."""
+    ids = table.column("id")
+    first_id = pc.min(ids).as_py()
+    last_id = pc.max(ids).as_py()
+    path = os.path.join(snapshot_dir, f"part-{first_id}-{last_id}.arrow")
+
+    # Write to a uniquely named temporary file so a crash never leaves a truncated part
+    fd, temp_path = tempfile.mkstemp(dir=snapshot_dir, prefix="tmp-", suffix=".arrow")
+    os.close(fd)
+    try:
+        with pa.OSFile(temp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return path
+
+
+def _drop_duplicate_ids(table):
+    """Keep only the last copy of each id, in case overlapping parts were written."""
+    ids = table.column("id")
+    if pc.count_distinct(ids).as_py() == table.num_rows:
+        return table
+    positions = table.append_column("_position", pa.array(range(table.num_rows), type=pa.int64()))
+    last_positions = positions.group_by("id").aggregate([("_position", "max")]).column("_position_max")
+    return table.take(last_positions.take(pc.sort_indices(last_positions)))
+
+
+def _read_parts(paths):
+    """Read and concatenate memory-mapped snapshot parts without duplicate ids."""
+    tables = [pa.ipc.open_file(pa.memory_map(path, "r")).read_all() for path in paths]
+    return _drop_duplicate_ids(pa.concat_tables(tables))
+
+
+def _compact_parts(snapshot_dir, paths):
+    """Merge all parts into a single file once there are too many of them."""
+    merged_path = _write_part(snapshot_dir, _read_parts(paths))
+    for path in paths:
+        if path != merged_path:
+            os.remove(path)
+    logging.info(f"Compacted {len(paths)} analytics snapshot parts.")
+
+
+def _rebuild_snapshot():
+    """Rebuild the snapshot from the full table in a new directory and swap it in.
+
+    The old snapshot is left untouched if fetching or writing fails.
+    """
+    rows, columns, _, _ = fetch_cheque_details_since(None)
+    new_dir = tempfile.mkdtemp(dir=ANALYTICS_STORE_DIR, prefix="rebuild-")
+    try:
+        if rows:
+            _write_part(new_dir, _rows_to_table(rows, columns))
+    except Exception:
+        shutil.rmtree(new_dir, ignore_errors=True)
+        raise
+
+    old_dir = tempfile.mkdtemp(dir=ANALYTICS_STORE_DIR, prefix="stale-")
+    old_snapshot = os.path.join(old_dir, "cheque_details")
+    if os.path.exists(SNAPSHOT_DIR):
+        os.replace(SNAPSHOT_DIR, old_snapshot)
+    try:
+        os.replace(new_dir, SNAPSHOT_DIR)
+    except Exception:
+        if os.path.exists(old_snapshot):
+            os.replace(old_snapshot, SNAPSHOT_DIR)
+        shutil.rmtree(new_dir, ignore_errors=True)
+        raise
+    finally:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    logging.info(f"Rebuilt the analytics snapshot with {len(rows)} cheque details.")
+
+
+def _sync_snapshot():
+    """Append cheque details added since the last sync to the snapshot.
+
+    Only new ids are fetched, so rows that were updated in place keep
+    their old values until the snapshot is rebuilt. Deleted rows, a
+    truncated table or a reset id sequence are caught by comparing the
+    table's row count and highest id with the snapshot, which then
+    triggers a full rebuild, as does a change to the table's columns.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    paths = _part_paths(SNAPSHOT_DIR)
+
+    try:
+        snapshot = _read_parts(paths) if paths else None
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as error:
+        logging.error(f"Unreadable analytics snapshot, rebuilding: {error}")
+        _rebuild_snapshot()
+        return
+
+    last_id = pc.max(snapshot.column("id")).as_py() if snapshot is not None else None
+    rows, columns, total_count, max_id = fetch_cheque_details_since(last_id)
+    new_rows = _rows_to_table(rows, columns)
+
+    if snapshot is not None and not snapshot.schema.equals(new_rows.schema):
+        logging.info("cheque_details columns changed, rebuilding the analytics snapshot.")
+        _rebuild_snapshot()
+        return
+
+    snapshot_count = (snapshot.num_rows if snapshot is not None else 0) + new_rows.num_rows
+    snapshot_max_id = pc.max(new_rows.column("id")).as_py() if rows else last_id
+    if snapshot_count != total_count or snapshot_max_id != max_id:
+        logging.info("cheque_details rows were removed or renumbered, rebuilding the analytics snapshot.")
+        _rebuild_snapshot()
+        return
+
+    if rows:
+        _write_part(SNAPSHOT_DIR, new_rows)
+        logging.info(f"Appended {len(rows)} cheque details to the analytics snapshot.")
+
+    paths = _part_paths(SNAPSHOT_DIR)
+    if len(paths) > MAX_SNAPSHOT_PARTS:
+        _compact_parts(SNAPSHOT_DIR, paths)
+
+
+def load_snapshot(rebuild=False):
+    """Sync the snapshot and return it as a memory-mapped Arrow table.
+
+    Pass rebuild=True to discard the snapshot and refetch the whole table,
+    e.g. after rows were edited in place. Returns None if there are no
+    cheque details yet. Database errors are raised to the caller and leave
+    the existing snapshot as it was.
+    """
+    with _snapshot_lock():
+        if rebuild:
+            _rebuild_snapshot()
+        else:
+            _sync_snapshot()
+        paths = _part_paths(SNAPSHOT_DIR)
+        return _read_parts(paths) if paths else None
@@ -9,6 +9,7 @@ import tempfile
 # Third-party libraries
 import fitz  # PyMuPDF
 import pandas as pd
+import pyarrow.compute as pc
 import matplotlib.pyplot as plt
 
 import matplotlib
@@ -20,7 +21,8 @@ from reportlab.pdfgen import canvas
 from fpdf import FPDF
 
 # Local modules
-from db_handler import insert_cheque_details, fetch_cheque_details, get_db_connection
+from db_handler import insert_cheque_details
+from analytics_store import load_snapshot
 
 
 from gemini import Model
@@ -96,16 +98,6 @@ def preprocess_cheque_details(details):
     details["signature_name"] = details.get("signatureName", "")
     return details
 
-def get_column_names():
-    """Retrieve column names dynamically from the database."""
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    cursor.execute("SELECT * FROM cheque_details LIMIT 0")
-    column_names = [desc[0] for desc in cursor.description]
-    cursor.close()
-    connection.close()
-    return column_names
-
 # Streamlit App Pages
 
 def home_page():
@@ -248,13 +240,6 @@ def upload_page():
 
 
 
-# Function to clean the amount string
-def clean_amount(amount_str):
-    """Remove non-numeric characters and convert to float."""
-    if not amount_str or not amount_str.strip().replace(",", "").replace("/-", "").isnumeric():
-        return 0.0
-    return float(amount_str.replace(",", "").replace("/-", "").strip())
-
 # Visualization Functions
 def plot_pie_chart(amounts, labels):
     fig, ax = plt.subplots(figsize=(8, 8))
@@ -353,26 +338,33 @@ def save_plot_as_temp_png(fig):
 def analytics_page():
     st.title("Analytics Dashboard")
 
-    # Fetch and preprocess cheque details
-    rows = fetch_cheque_details()  # Replace with your database fetch function
+    # Rebuild the snapshot on request, e.g. after cheque rows were edited in place
+    rebuild = st.button("Refresh Data from Database")
 
-    if rows:
-        df = pd.DataFrame(rows, columns=get_column_names())  # Replace with your column names
-        df['amount_in_numbers'] = df['amount_in_numbers'].apply(clean_amount)
-        df['amount_in_numbers'] = pd.to_numeric(df['amount_in_numbers'], errors='coerce')
-        df.dropna(subset=['amount_in_numbers'], inplace=True)
+    # Load cheque details from the local columnar snapshot, fetching only new rows
+    try:
+        snapshot = load_snapshot(rebuild=rebuild)
+    except Exception as error:
+        st.error(f"Error loading analytics data: {error}")
+        return
+
+    if snapshot is not None and snapshot.num_rows:
+        # amount_in_numbers is already cleaned to float64 in the snapshot
+        snapshot = snapshot.filter(pc.is_valid(snapshot["amount_in_numbers"]))
 
         # Display aggregate data
         st.subheader("Summary Statistics")
-        st.metric("Total Banks", df['bank_name'].nunique())
-        st.metric("Total Cheque Amount", f"${df['amount_in_numbers'].sum():,.2f}")
-        st.metric("Total Cheques", len(df))
+        st.metric("Total Banks", pc.count_distinct(snapshot["bank_name"]).as_py())
+        st.metric("Total Cheque Amount", f"${pc.sum(snapshot['amount_in_numbers']).as_py() or 0:,.2f}")
+        st.metric("Total Cheques", snapshot.num_rows)
 
         # Sorting and filtering options
         st.subheader("Cheque Details Table")
-        sort_by = st.selectbox("Sort by", df.columns[1:], key="sort_by")
+        sort_by = st.selectbox("Sort by", snapshot.column_names[1:], key="sort_by")
         sort_order = st.radio("Sort order", ["Ascending", "Descending"], key="sort_order")
-        df = df.sort_values(by=sort_by, ascending=(sort_order == "Ascending"))
+        snapshot = snapshot.sort_by([(sort_by, sort_order.lower())])
+        # Keep Arrow-backed columns so the table view doesn't copy into Python objects
+        df = snapshot.to_pandas(types_mapper=pd.ArrowDtype)
         st.dataframe(df)
 
         # Visualization
@@ -380,8 +372,16 @@ def analytics_page():
 
         # Pie Chart
         st.subheader("Pie Chart: Top 5 Bank Names by Cheque Amount")
-        pie_data = df.groupby("bank_name")["amount_in_numbers"].sum().nlargest(5).reset_index()
-        pie_fig = plot_pie_chart(pie_data["amount_in_numbers"], pie_data["bank_name"])
+        pie_data = (
+            snapshot.filter(pc.is_valid(snapshot["bank_name"]))
+            .group_by("bank_name")
+            .aggregate([("amount_in_numbers", "sum")])
+            .sort_by([("amount_in_numbers_sum", "descending")])
+            .slice(0, 5)
+        )
+        pie_fig = plot_pie_chart(
+            pie_data["amount_in_numbers_sum"].to_pylist(), pie_data["bank_name"].to_pylist()
+        )
         st.pyplot(pie_fig)
         st.download_button(
             "Download Pie Chart as PNG",
@@ -391,8 +391,12 @@ def analytics_page():
 
         # Bar Chart
         st.subheader("Bar Chart: Highest Cheque Amounts by Payee Name")
-        bar_data = df.nlargest(5, "amount_in_numbers")
-        bar_fig = plot_bar_chart(bar_data["amount_in_numbers"], bar_data["payee_name"])
+        bar_data = snapshot.take(
+            pc.select_k_unstable(snapshot, k=5, sort_keys=[("amount_in_numbers", "descending")])
+        )
+        bar_fig = plot_bar_chart(
+            bar_data["amount_in_numbers"].to_pylist(), bar_data["payee_name"].to_pylist()
+        )
         st.pyplot(bar_fig)
         st.download_button(
             "Download Bar Chart as PNG",
@@ -402,7 +406,9 @@ def analytics_page():
 
         # Scatter Plot
         st.subheader("Scatter Chart: Cheque Amount vs Bank Name")
-        scatter_fig = plot_scatter_chart(df["amount_in_numbers"], df["bank_name"])
+        scatter_fig = plot_scatter_chart(
+            snapshot["amount_in_numbers"].to_numpy(), snapshot["bank_name"].to_pylist()
+        )
         st.pyplot(scatter_fig)
         st.download_button(
             "Download Scatter Chart as PNG",
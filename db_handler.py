@@ -106,3 +106,32 @@ def fetch_cheque_details():
         logging.error(f"Error fetching cheque details: {error}")
         return []
 
+
+# Fetch the cheque details added after the given id, along with the column
+# names and type codes and the table's current row count and highest id
+def fetch_cheque_details_since(last_id=None):
+    try:
+        connection = get_db_connection()
+        # Read everything from one snapshot so the count matches the rows
+        connection.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        cursor = connection.cursor()
+
+        cursor.execute("SELECT COUNT(*), MAX(id) FROM cheque_details")
+        total_count, max_id = cursor.fetchone()
+
+        if last_id is None:
+            cursor.execute("SELECT * FROM cheque_details ORDER BY id")
+        else:
+            cursor.execute("SELECT * FROM cheque_details WHERE id > %s ORDER BY id", (last_id,))
+
+        rows = cursor.fetchall()
+        columns = [(desc[0], desc[1]) for desc in cursor.description]
+        connection.commit()
+        cursor.close()
+        connection.close()
+
+        return rows, columns, total_count, max_id
+
+    except Exception as error:
+        logging.error(f"Error fetching new cheque details: {error}")
+        raise
@@ -0,0 +1,122 @@
+import pytest
+
+import analytics_store
+
+
+# PostgreSQL type OIDs as reported in cursor.description
+INTEGER, TEXT, DATE = 23, 25, 1082
+
+COLUMNS = [("id", INTEGER), ("payee_name", TEXT), ("amount_in_numbers", TEXT)]
+
+
+class FakeChequeTable:
+    """Stands in for the cheque_details table behind fetch_cheque_details_since."""
+
+    def __init__(self, rows, columns=COLUMNS):
+        self.rows = list(rows)
+        self.columns = columns
+        self.fetches = []
+
+    def fetch_since(self, last_id=None):
+        self.fetches.append(last_id)
+        rows = [row for row in self.rows if last_id is None or row[0] > last_id]
+        max_id = max((row[0] for row in self.rows), default=None)
+        return rows, self.columns, len(self.rows), max_id
+
+
+def make_rows(first_id, last_id):
+    return [(i, f"Payee {i}", f"{i},000") for i in range(first_id, last_id + 1)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_store, "ANALYTICS_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(analytics_store, "SNAPSHOT_DIR", str(tmp_path / "cheque_details"))
+    monkeypatch.setattr(analytics_store, "LOCK_PATH", str(tmp_path / "cheque_details.lock"))
+
+    def use_table(table):
+        monkeypatch.setattr(analytics_store, "fetch_cheque_details_since", table.fetch_since)
+        return table
+
+    return use_table
+
+
+def snapshot_ids(snapshot):
+    return sorted(snapshot["id"].to_pylist())
+
+
+def test_incremental_append(store):
+    table = store(FakeChequeTable(make_rows(1, 5)))
+    assert snapshot_ids(analytics_store.load_snapshot()) == [1, 2, 3, 4, 5]
+
+    table.rows += make_rows(6, 7)
+    snapshot = analytics_store.load_snapshot()
+
+    assert snapshot_ids(snapshot) == [1, 2, 3, 4, 5, 6, 7]
+    assert table.fetches == [None, 5]
+    assert len(analytics_store._part_paths(analytics_store.SNAPSHOT_DIR)) == 2
+    assert snapshot["amount_in_numbers"].to_pylist()[-1] == 7000.0
+
+
+def test_compaction_past_max_parts(store, monkeypatch):
+    monkeypatch.setattr(analytics_store, "MAX_SNAPSHOT_PARTS", 3)
+    table = store(FakeChequeTable([]))
+    for i in range(1, 5):
+        table.rows += make_rows(i, i)
+        analytics_store.load_snapshot()
+
+    paths = analytics_store._part_paths(analytics_store.SNAPSHOT_DIR)
+    assert len(paths) == 1
+    assert snapshot_ids(analytics_store.load_snapshot()) == [1, 2, 3, 4]
+
+
+def test_overlapping_parts_do_not_duplicate_ids(store):
+    table = store(FakeChequeTable(make_rows(1, 8)))
+    snapshot_dir = analytics_store.SNAPSHOT_DIR
+    analytics_store.load_snapshot()
+
+    # Simulate two sessions that appended overlapping ranges
+    analytics_store._write_part(snapshot_dir, analytics_store._rows_to_table(make_rows(6, 7), COLUMNS))
+    analytics_store._write_part(snapshot_dir, analytics_store._rows_to_table(make_rows(6, 8), COLUMNS))
+    paths = analytics_store._part_paths(snapshot_dir)
+    assert snapshot_ids(analytics_store._read_parts(paths)) == list(range(1, 9))
+
+    analytics_store._compact_parts(snapshot_dir, paths)
+    assert snapshot_ids(analytics_store.load_snapshot()) == list(range(1, 9))
+    assert table.fetches == [None, 8]
+
+
+def test_rebuild_after_schema_change(store):
+    table = store(FakeChequeTable(make_rows(1, 3)))
+    analytics_store.load_snapshot()
+
+    table.columns = COLUMNS + [("cheque_date", DATE)]
+    table.rows = [row + (None,) for row in table.rows]
+    snapshot = analytics_store.load_snapshot()
+
+    assert snapshot.column_names[-1] == "cheque_date"
+    assert str(snapshot.schema.field("cheque_date").type) == "date32[day]"
+    assert snapshot_ids(snapshot) == [1, 2, 3]
+
+
+def test_rebuild_after_rows_deleted(store):
+    table = store(FakeChequeTable(make_rows(1, 5)))
+    analytics_store.load_snapshot()
+
+    table.rows = [row for row in table.rows if row[0] != 3]
+    assert snapshot_ids(analytics_store.load_snapshot()) == [1, 2, 4, 5]
+
+
+def test_database_error_keeps_existing_snapshot(store, monkeypatch):
+    store(FakeChequeTable(make_rows(1, 3)))
+    analytics_store.load_snapshot()
+
+    def unreachable(last_id=None):
+        raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(analytics_store, "fetch_cheque_details_since", unreachable)
+    with pytest.raises(ConnectionError):
+        analytics_store.load_snapshot(rebuild=True)
+
+    store(FakeChequeTable(make_rows(1, 3)))
+    assert snapshot_ids(analytics_store.load_snapshot()) == [1, 2, 3]